@@ -4,18 +4,35 @@ Turing Machine emulator - model.py
 Contains the model of the Turing Machine (classes)
 """
 
-from email import message
-from os import stat
-import time
-from typing import Any, Dict, List, Tuple, Union
-from tools import *
-from printf import warning, error
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+from printf import bold, foreground, get_terminal_width, info, print_step, reset, strikethrough, underline, warning
 
 LEFT = 'L'
 RIGHT = 'R'
 BLANK = '_'
 ANY = '*'
 
+# Default alphabet of a Turing Machine
+ALPHABET = (BLANK, '0', '1')
+
+# Tape cells hold codes of the tape's code table (see `Tape.encode`)
+BLANK_CODE = 0
+CODES = 0x100
+
+# Head offsets of the directions
+OFFSETS = {LEFT: -1, RIGHT: 1, ANY: 0}
+
+
+def _overallocate(size: int) -> int:
+    """
+    Capacity to reserve for `size` cells (growth pattern of CPython's list)
+    """
+
+    return size + (size >> 3) + (3 if size < 9 else 6)
+
+
 class Transition:
     """
     Transition class
@@ -28,6 +45,11 @@ class Transition:
         self.new_char = new_char
         self.direction = direction
 
+        # Head offset of the direction
+        if direction not in OFFSETS:
+            raise ValueError(f'Unknown direction \'{direction}\'')
+        self.offset = OFFSETS[direction]
+
     def __str__(self):
         return f'Transition({self.state} {self.char} -> {self.new_state} {self.new_char} {self.direction})'
 
@@ -43,6 +65,8 @@ class State:
     State of the Turing Machine
     """
 
+    __slots__ = ('_name', '_transitions')
+
     _name: str
     _transitions: Dict[str, Transition]
 
@@ -95,7 +119,25 @@ class State:
         return str(self)
 
     def __eq__(self, other: object) -> bool:
-        return str(self) == str(other)
+        return other is self or (isinstance(other, State) and self._name == other._name)
+
+    def __hash__(self) -> int:
+        return hash(self._name)
+
+
+@lru_cache(maxsize=8)
+def _borders(width: int) -> Tuple[int, str, str]:
+    """
+    Cells per side of the head and top / bottom border of `Tape.fancy` for a terminal width
+    """
+
+    span = width // 4 - 1
+    return span, '┏' + '━┳' * span * 2 + '━┓\n┃', '\n┗' + '━┻' * span * 2 + '━┛'
+
+
+# Placeholder transition shown while the machine is driven by hand (see `TuringMachine.show`)
+_WILDCARD = State(ANY)
+_DISPLAY = Transition(_WILDCARD, ANY, _WILDCARD, ANY, ANY)
 
 
 class Tape:
@@ -103,30 +145,53 @@ class Tape:
     Tape of the Turing Machine
     """
     
-    _tape: List[str] = []
-    _head: int = 0
+    _tape: bytearray
+    _chars: List[str]
+    _codes: Dict[str, int]
+    _head: int
+    _origin: int
+    _start: int
+    _end: int
 
     def __init__(self, tape: Union[str, List[str]]):
         """
         Initialize tape
         """
 
-        if isinstance(tape, str):
-            self._tape = [c for c in tape]
-        elif isinstance(tape, list):
-            self._tape = tape
-        else:
+        if not isinstance(tape, (str, list)):
             raise TypeError(f'Unknown type \'{type(tape)}\' for tape')
 
+        # Code table (characters by code and codes by character, the blank is always `BLANK_CODE`)
+        self._chars = [BLANK]
+        self._codes = {BLANK: BLANK_CODE}
+
+        self._tape = bytearray(map(self.encode, ''.join(tape)))
+
+        # Head position and position of the first cell of `_tape`
         self._head = 0
+        self._origin = 0
+
+        # Visited part of the tape (`_tape` may hold spare blanks around it)
+        self._start = 0
+        self._end = len(self._tape)
+
+        # Make sure the cell under the head always exists
+        self._grow(0)
 
     @property
-    def tape(self) -> List[str]:
+    def tape(self) -> bytearray:
         """
         Get tape
         """
         return self._tape
 
+    @property
+    def origin(self) -> int:
+        """
+        Get position of the first cell of `tape`
+        """
+        return self._origin
+
     @property
     def head(self) -> int:
         """
@@ -139,29 +204,79 @@ class Tape:
         """
         Set head
         """
-    
-        while value >= len(self.tape):
-            self.tape.append(BLANK)
-        while value < 0:
-            self.tape.insert(0, BLANK)
-            self.head += 1
-            value += 1
-        else:
-            self._head = value
+
+        if not self._start <= value < self._end:
+            self._grow(value)
+        self._head = value
+
+    def _grow(self, index: int):
+        """
+        Extend the tape with blanks until it covers `index`
+        """
+
+        if index < self._start:
+            if index < self._origin:
+                grow = _overallocate(self._origin + len(self._tape) - index) - len(self._tape)
+                self._tape[:0] = bytes([BLANK_CODE]) * grow
+                self._origin -= grow
+            self._start = index
+        elif index >= self._end:
+            if index >= self._origin + len(self._tape):
+                grow = _overallocate(index - self._origin + 1) - len(self._tape)
+                self._tape.extend(bytes([BLANK_CODE]) * grow)
+            self._end = index + 1
+
+    def encode(self, char: str) -> int:
+        """
+        Get code of a character (assigned on first use)
+        """
+
+        code = self._codes.get(char)
+        if code is None:
+            code = len(self._chars)
+            if code >= CODES:
+                raise ValueError(f'Tape cannot hold more than {CODES} different characters')
+            self._chars.append(char)
+            self._codes[char] = code
+        return code
+
+    def cover(self, low: int, high: int):
+        """
+        Mark the cells from `low` to `high` as visited
+        """
+
+        self._grow(low)
+        self._grow(high)
 
     def move_head(self, direction: str):
         """
         Move head
         """
 
-        if direction == LEFT:
-            self.head -= 1
-        elif direction == RIGHT:
-            self.head += 1
-        elif direction == ANY:
-            pass
-        else:
+        if direction not in OFFSETS:
             raise ValueError(f'Unknown direction \'{direction}\'')
+        self.head += OFFSETS[direction]
+
+    @property
+    def code(self) -> int:
+        """
+        Get code of the character under the head
+        """
+        return self._tape[self._head - self._origin]
+
+    @code.setter
+    def code(self, value: int):
+        """
+        Set code of the character under the head
+        """
+        self._tape[self._head - self._origin] = value
+
+    @property
+    def current(self) -> str:
+        """
+        Get character under the head
+        """
+        return self._chars[self._tape[self._head - self._origin]]
 
     def __getitem__(self, index):
         """
@@ -170,14 +285,8 @@ class Tape:
 
         index = self.head + index
 
-        while index >= len(self.tape):
-            self.tape.append(BLANK)
-        while index < 0:
-            self.tape.insert(0, BLANK)
-            self.head += 1
-            index += 1
-        else:
-            return self.tape[index]
+        self._grow(index)
+        return self._chars[self._tape[index - self._origin]]
 
     def __setitem__(self, index, value):
         """
@@ -186,55 +295,48 @@ class Tape:
 
         index = self.head + index
 
-        while index >= len(self.tape):
-            self.tape.append(BLANK)
-        while index < 0:
-            self.tape.insert(0, BLANK)
-            self.head += 1
-            index += 1
+        self._grow(index)
         if value != ANY:
-            self.tape[index] = value
+            self._tape[index - self._origin] = self.encode(value)
 
     def __len__(self):
         """
         Get length of tape
         """
 
-        return len(self.tape)
+        return self._end - self._start
 
     def __str__(self):
         """
         String representation
         """
 
-        return ''.join(self.tape)
+        offset = self._start - self._origin
+        chars = self._chars
+        return ''.join([chars[code] for code in self._tape[offset:offset + len(self)]])
 
     def fancy(self):
         """
         Fancy representation
         """
 
-        tape_str = ''
-
         fancy = lambda string: string.replace('_', f'{strikethrough()}␣{reset()}')
 
         # get terminal width
-        width = get_terminal_width()
-
-        span = width // 4 - 1
+        span, top, bottom = _borders(get_terminal_width())
 
-        tape_str += '┏' + '━┳' * span * 2 + '━┓\n┃'
+        parts = [top]
 
         for index in range(-span, span + 1):
             if index == 0:
-                tape_str += f'{foreground(0,255,0)}{bold()}{underline()}' + fancy(self[index]) + f'{reset()}'
+                parts.append(f'{foreground(0,255,0)}{bold()}{underline()}' + fancy(self[index]) + f'{reset()}')
             else:
-                tape_str += fancy(self[index])
-            tape_str += '┃'
+                parts.append(fancy(self[index]))
+            parts.append('┃')
 
-        tape_str += '\n┗' + '━┻' * span * 2 + '━┛'
-        
-        return tape_str
+        parts.append(bottom)
+
+        return ''.join(parts)
 
     def __repr__(self):
         return str(self)
@@ -262,7 +364,9 @@ class TransitionTable:
         """
         Set state
         """
+        del self._states_by_name[self.states[key].name]
         self.states[key] = value
+        self._states_by_name[value.name] = value
 
     def __init__(self, states: List[State], tape: Tape):
         """
@@ -270,22 +374,59 @@ class TransitionTable:
         """
 
         self._states = states
+        self._states_by_name: Dict[str, State] = {state.name: state for state in states}
         self._tape = tape
 
+    def _add_state(self, state: State):
+        """
+        Add state to the table (if no state with the same name exists yet)
+        """
+
+        if state.name not in self._states_by_name:
+            self._states_by_name[state.name] = state
+            self.states.append(state)
+
+    def _get_state(self, name: Union[str, State]) -> State:
+        """
+        Get the state of the table with the given name (added if missing)
+        """
+
+        if isinstance(name, State):
+            name = name.name
+
+        state = self._states_by_name.get(name)
+        if state is None:
+            state = State(name)
+            self._states_by_name[name] = state
+            self.states.append(state)
+        return state
+
+    def remove(self, name: str):
+        """
+        Remove the state with the given name (if it exists)
+        """
+
+        state = self._states_by_name.pop(name, None)
+        if state is not None:
+            self.states.remove(state)
+
+    def find(self, name: str) -> Optional[State]:
+        """
+        Get the state of the table with the given name or `None`
+        """
+
+        return self._states_by_name.get(name)
+
     def __call__(self, state: 'State', char: str) -> Any:
         """
         Find matching `Transition` or return `None`
-        """
 
-        for state_self in self.states:
-            if state_self == state:
-                state = state_self
-            for transition in state.transitions:
-                transition: Transition = state.transitions[transition]
-                if transition.char == char or transition.char == ANY:
-                    return transition
+        Transitions on the character take precedence over ANY transitions.
+        """
 
-        return None
+        transitions = state.transitions
+        transition = transitions.get(char)
+        return transition if transition is not None else transitions.get(ANY)
 
     def __str__(self):
         """
@@ -303,32 +444,28 @@ class TransitionTable:
         """
 
         if isinstance(other, Transition):
-            if other.state not in self.states:
+            if other.state.name not in self._states_by_name:
                 warning(f'State {other.state} not found in transition table! Adding it now...')
-                self.states.append(other.state)
-            if other.new_state not in self.states:
+                self._add_state(other.state)
+            if other.new_state.name not in self._states_by_name:
                 warning(f'State {other.new_state} not found in transition table! Adding it now...')
-                self.states.append(other.new_state)
-            for index, state in enumerate(self.states):
-                if state == other.state:
-                    other.state = state
-                    self.states[index].transitions[other.char] = other
-                if state == other.new_state:
-                    other.new_state = state
+                self._add_state(other.new_state)
+            other.state = self._states_by_name[other.state.name]
+            other.new_state = self._states_by_name[other.new_state.name]
+            other.state.transitions[other.char] = other
         elif isinstance(other, State):
-            if other not in self.states:
-                self.states.append(other)
+            self._add_state(other)
         elif isinstance(other, TransitionTable):
-            self.states.extend(other.states)
+            for state in other.states:
+                self._add_state(state)
+            for state in other.states:
+                for transition in list(state.transitions.values()):
+                    self.append(transition)
         elif isinstance(other, list):
-            if State(other[0]) not in self.states:
-                self.append(State(other[0]))
-            if State(other[2]) not in self.states:
-                self.append(State(other[2]))
             self.append(Transition(
-                state=State(other[0]),
+                state=self._get_state(other[0]),
                 char=other[1],
-                new_state=State(other[2]),
+                new_state=self._get_state(other[2]),
                 new_char=other[3],
                 direction=other[4]
             ))
@@ -341,13 +478,44 @@ class TransitionTable:
         """
 
         if isinstance(item, State):
-            return item in self.states
+            return item.name in self._states_by_name
         elif isinstance(item, Transition):
-            return item.state in self.states and item in item.state.transitions
+            state = self._states_by_name.get(item.state.name)
+            return state is not None and item.char in state.transitions
         else:
             raise TypeError(f'Cannot check if \'{type(item)}\' is in TransitionTable')
 
 
+def _run_n(rows: array, write: array, move: array, halted: bytearray, cells: bytearray, head: int, row: int, steps: int) -> Tuple[int, int, int, int, int]:
+    """
+    Run up to `steps` steps on the compiled tables of a `TuringMachine`
+
+    Stops early in a halt state, without a transition or once the head leaves `cells`.
+    Returns the head, the state row, the steps done and the lowest / highest visited cell.
+    """
+
+    size = len(cells)
+    low = high = head
+    done = 0
+
+    while done < steps and 0 <= head < size and not halted[row]:
+        index = row * CODES + cells[head]
+        nxt = rows[index]
+        if nxt < 0:
+            break
+        if write[index] >= 0:
+            cells[head] = write[index]
+        head += move[index]
+        row = nxt
+        done += 1
+        if head < low:
+            low = head
+        elif head > high:
+            high = head
+
+    return head, row, done, low, high
+
+
 class TuringMachine:
     """
     Turing Machine
@@ -356,8 +524,8 @@ class TuringMachine:
     _transition_table: TransitionTable
     _tape: Tape
     _state: State
-    _halt: List[State] = ['HALT']
-    _alphabet: List[str] = [BLANK, '0', '1']
+    _halt: List[State]
+    _alphabet: List[str]
 
     @property
     def transition_table(self) -> TransitionTable:
@@ -386,6 +554,7 @@ class TuringMachine:
         Set state
         """
         self._state = value
+        self._row = self._rows.get(value.name, -1)
 
     @property
     def halt(self) -> List[State]:
@@ -410,7 +579,7 @@ class TuringMachine:
         if state is not None:
             if transition_table is None or state not in transition_table:
                 raise ValueError(f'Starting state \'{state}\' not in transition table.')
-            self._state = state
+            self._state = transition_table.find(state.name)
 
         # Initialize transition table
         if transition_table is not None:
@@ -421,6 +590,12 @@ class TuringMachine:
             self._tape = tape
         elif tape is not None:
             self._tape = Tape(tape)
+        else:
+            self._tape = Tape('')
+
+        # Default halt state and alphabet (per machine)
+        self._halt = ['HALT']
+        self._alphabet = list(ALPHABET)
 
         # Append halt state
         if halt is not None:
@@ -430,24 +605,122 @@ class TuringMachine:
         if alphabet is not None:
             self._alphabet += alphabet
 
+        # Names of the halt states
+        self._halt_names = frozenset(state.name if isinstance(state, State) else state for state in self._halt)
+
+        if transition_table is not None:
+            self._compile()
+            if state is not None:
+                self._row = self._rows[self._state.name]
+
+    def _compile(self):
+        """
+        Flatten the transition table into arrays indexed by `row * CODES + code`
+
+        `_next` holds the row of the next state (-1 if there is no transition),
+        `_write` the code to write (-1 to keep the cell) and `_move` the head offset.
+        `_halted` flags the rows of halt states and `_transitions` holds the
+        `Transition` objects for `step`. Codes are those of the tape's code table;
+        every character of the alphabet and the transitions gets one here, so codes
+        assigned later only match ANY transitions.
+        """
+
+        states = self.transition_table.states
+        encode = self.tape.encode
+        for char in self.alphabet:
+            encode(char)
+        self._rows: Dict[str, int] = {state.name: row for row, state in enumerate(states)}
+
+        size = len(states) * CODES
+        self._next = array('i', [-1]) * size
+        self._write = array('h', [-1]) * size
+        self._move = array('b', [0]) * size
+        self._transitions: List[Optional[Transition]] = [None] * size
+
+        self._halted = bytearray(state.name in self._halt_names for state in states)
+
+        for row, state in enumerate(states):
+            # ANY transitions cover every code, transitions on a character override them
+            transitions = state.transitions
+            wildcard = transitions.get(ANY)
+            columns = [(code, wildcard) for code in range(CODES)] if wildcard is not None else []
+            columns += [(encode(char), transition) for char, transition in transitions.items() if char != ANY]
+
+            for code, transition in columns:
+                index = row * CODES + code
+                self._transitions[index] = transition
+                self._next[index] = self._rows[transition.new_state.name]
+                if transition.new_char != ANY:
+                    self._write[index] = encode(transition.new_char)
+                self._move[index] = transition.offset
+
+    def skip(self, steps: int) -> int:
+        """
+        Run up to `steps` steps without printing, return the number of steps done
+        """
+
+        row = self._row
+        if row < 0:
+            return 0
+
+        tape = self.tape
+        done = 0
+
+        while done < steps:
+            cells = tape.tape
+            size = len(cells)
+            origin = tape.origin
+            head, row, count, low, high = _run_n(
+                self._next, self._write, self._move, self._halted,
+                cells, tape.head - origin, row, steps - done
+            )
+            done += count
+            tape.cover(low + origin, high + origin)
+            tape.head = head + origin
+
+            # Stopped on the tape: halted or no transition
+            if 0 <= head < size:
+                break
+
+        self._state = self.transition_table.states[row]
+        self._row = row
+        return done
+
     def step(self, step: int) -> bool:
         """
         Step Turing Machine
         """
 
+        tape = self.tape
+
         # Get transition
-        transition = self.transition_table(self.state, self.tape[0])
+        if self._row < 0:
+            return False
+        index = self._row * CODES + tape.code
+        transition = self._transitions[index]
         if transition is None:
-            # raise ValueError(f'No transition for {self.state} {self.tape[0]}')
+            # raise ValueError(f'No transition for {self.state} {tape.current}')
             return False
-        self.tape[0] = transition.new_char
-        self.state = transition.new_state
-        self.tape.move_head(transition.direction)
+        code = self._write[index]
+        if code >= 0:
+            tape.code = code
+        self._state = transition.new_state
+        self._row = self._next[index]
+        tape.head += transition.offset
 
         print_step(self, transition, step)
 
         return True
 
+    def show(self, step: int):
+        """
+        Print the current configuration without a transition
+        """
+
+        _DISPLAY.state = self.state
+        _DISPLAY.char = self.tape.current
+        print_step(self, _DISPLAY, step)
+
     def run(self):
         """
         Run Turing Machine
@@ -459,9 +732,9 @@ class TuringMachine:
 
         while inpt != 'q':
             if not self.step(step):
-                print_step(self, Transition(self.state, self.tape[0], State('*'), '*', '*'), step)
+                self.show(step)
             msg = 'Stepped one step.'
-            if self.state in self.halt:
+            if self.state.name in self._halt_names:
                 msg = f'HALTED at step {step}'
             else:
                 step += 1
@@ -472,10 +745,7 @@ class TuringMachine:
 
             while inpt != '':
                 if inpt.isdigit():
-                    for x in range(int(inpt)):
-                        if self.step(step):
-                            step += 1
-                            time.sleep(0.01)
+                    step += self.skip(int(inpt))
                     msg = f'Skipping forward {int(inpt)} steps'
                     break
                 elif inpt == 'r':
@@ -485,7 +755,7 @@ class TuringMachine:
                     self.tape.move_head(LEFT)
                     msg = 'Moving head left'
                 elif inpt[0] == '$':
-                    self.state = State(inpt[1:])
+                    self.state = self.transition_table.find(inpt[1:]) or State(inpt[1:])
                     msg = f'Changing state to {self.state}'
                 elif inpt[0] == '+' and len(inpt) > 1 and inpt[1] in self.alphabet:
                     msg = f'Writing {inpt[1:]} to tape'
@@ -493,7 +763,7 @@ class TuringMachine:
                 else:
                     msg = f'Invalid input \'{inpt}\''
 
-                print_step(self, Transition(self.state, self.tape[0], State('*'), '*', '*'), step)
+                self.show(step)
 
                 info(msg)
 
@@ -3,11 +3,12 @@ Parse a turing machine saved as a .tur file
 """
 
 import os
-from tkinter import ALL
-from typing import List, Union
-from model import Tape, Transition, State, TransitionTable, TuringMachine, BLANK, ANY
+import re
+from functools import partial
+from typing import Callable, Dict, List, Pattern, Tuple, Union
+from model import Tape, Transition, State, TransitionTable, TuringMachine, ALPHABET, BLANK, ANY, CODES
 from printf import *
-from tools import allowed_state, allowed_tape, allowed_transition, strip_state, ALLOWED
+from tools import ALLOWED, NAME_CHARS, STATE_CHARS, TAPE_CHARS, TRANSITION_CHARS
 
 IGNORE = [
     '\t',
@@ -22,71 +23,114 @@ class Scopes:
     Interpreter Scope / Scopes.NSPC
     """
 
-    TSTR = 'TSTR' # Tape string
-    ASTS = 'ASTS' # Add states
-    ATRS = 'ATRS' # Add transition
-    INIT = 'INIT' # Initial state
-    HLTS = 'HALT' # Halt state
-    ALPH = 'ALPH' # Alphabet
-    FNSP = 'FNSP' # Find name space start
-    NSPC = 'NSPC' # Name space
-    CMNT = 'CMNT' # Comment
-    SCRF = 'SCRF' # Sacrifice Constant (?)
+    TSTR = 0 # Tape string
+    ASTS = 1 # Add states
+    ATRS = 2 # Add transition
+    INIT = 3 # Initial state
+    HLTS = 4 # Halt state
+    ALPH = 5 # Alphabet
+    FNSP = 6 # Find name space start
+    NSPC = 7 # Name space
+    SCRF = 8 # Sacrifice Constant (?)
 
-    scopes: List[str]
+    # Display names (by scope)
+    NAMES = ('TSTR', 'ASTS', 'ATRS', 'INIT', 'HALT', 'ALPH', 'FNSP', 'NSPC', 'SCRF')
+
+    __slots__ = ('scopes', 'names', 'top', 'prefix')
+
+    # Stack of scopes and their names
+    scopes: List[int]
+    names: List[str]
+    top: int
+    prefix: str
 
     def __init__(self):
         """
         Initialize the scope
         """
         self.scopes = []
+        self.names = []
+        self.top = Scopes.NSPC
+        self.prefix = ''
 
-    def exit(self, scope: str=None):
+    def exit(self, scope: int=None):
         """
         Exit the current scope
         """
 
+        scopes = self.scopes
+        if scopes and (scope is None or self.top == scope):
+            exited = scopes.pop()
+            self.names.pop()
+            self.top = scopes[-1] if scopes else Scopes.NSPC
+            if exited == Scopes.NSPC:
+                self._update_prefix()
+            return exited
+
+        self._exit_failed(scope)
+
+    def _exit_failed(self, scope: int):
+        """
+        Report an invalid exit
+        """
+
         if self.scopes:
-            if not scope:
-                return self.scopes.pop()
-            elif self.scopes[-1][0] == scope:
-                return self.scopes.pop()
-            else:
-                error(f'Tried to exit {scope} but found {self.scopes[-1][0]}')
-                raise ValueError(f'Tried to exit {scope} but found {self.scopes[-1][0]}')
+            error(f'Tried to exit {Scopes.NAMES[scope]} but found {Scopes.NAMES[self.top]}')
+            raise ValueError(f'Tried to exit {Scopes.NAMES[scope]} but found {Scopes.NAMES[self.top]}')
         else:
-            error('Cannot exit scope. At root level!', self.scopes, scope)
+            error('Cannot exit scope. At root level!', self.scopes, Scopes.NAMES[scope] if scope is not None else scope)
             raise ValueError('Cannot exit scope. At root level!')
 
-    def enter(self, scope: str, name: str=None):
+    def enter(self, scope: int, name: str=None):
         """
         Enter a new scope
         """
 
-        self.scopes.append((scope, name))
+        self.scopes.append(scope)
+        self.names.append(name)
+        self.top = scope
+        if scope == Scopes.NSPC:
+            self._update_prefix()
 
-    def extend_name(self, name: str):
+    def _update_prefix(self):
         """
-        Extend the current scope with names
+        Rebuild the name prefix of the current Scopes.NSPC
         """
 
         count = 0
 
-        prefix = [
-            name if name else str(count := count + 1) 
-            for scope, name in self.scopes 
+        self.prefix = '.'.join(
+            name if name else str(count := count + 1)
+            for scope, name in zip(self.scopes, self.names)
             if scope == Scopes.NSPC
-        ]
-
-        return '.'.join(prefix + [name] if name != '' else prefix)
+        )
 
-    @property
-    def top(self) -> str:
+    def extend_name(self, name: str):
         """
-        Get the current Scopes.NSPC
+        Extend the current scope with names
         """
 
-        return self.scopes[-1][0] if self.scopes else Scopes.NSPC
+        if not self.prefix:
+            return name
+
+        return f'{self.prefix}.{name}' if name != '' else self.prefix
+
+# Characters with a meaning of their own in some scope
+SPECIAL = '&@$!~*#:{};>-\n'
+
+# Tokens (after ignored characters): runs of plain characters, single characters, end of text
+TOKENS = re.compile(f'[{re.escape("".join(IGNORE))}]*([^{re.escape(SPECIAL + "".join(IGNORE))}]+|.|$)', re.S)
+
+# Characters allowed in the values of each scope (whole runs or single characters)
+RUNS = {
+    Scopes.FNSP: re.compile(f'{NAME_CHARS}+'),
+    Scopes.TSTR: re.compile(f'{TAPE_CHARS}+'),
+    Scopes.ALPH: re.compile(f'{TAPE_CHARS}+'),
+    Scopes.ATRS: re.compile(f'{TRANSITION_CHARS}+'),
+    Scopes.INIT: re.compile(f'{STATE_CHARS}+'),
+    Scopes.HLTS: re.compile(f'{STATE_CHARS}+'),
+    Scopes.ASTS: re.compile(f'{STATE_CHARS}+'),
+}
 
 class Parser:
     """
@@ -156,350 +200,405 @@ class Parser:
         self.initial = None
         self.halt = []
         self.alphabet = []
+        self._alphabet_set = frozenset()
 
     def parse(self, verbose=False):
         """
         Parse file
         """
 
-        # global Scopes.NSPC, Scopes.TSTR, Scopes.ASTS, Scopes.ATRS, Scopes.INIT, Scopes.HLTS, Scopes.ALPH, Scopes.FNSP, Scopes.NSPC, Scopes.CMNT
-
         # Open file
         with open(self.file, 'r') as file:
             # Read file
             text = file.read()
-            queue = list(text)
-            lines = text.split('\n')
 
-        line_count = 1
-        ch_index = 0
-
-        buffer: List[str] = []
-        subbuffer: str = ''
-        scopes: Scopes = Scopes()
-        history: List[str] = []
-
-        errors = 0
+        # Parser state (shared with the handlers)
+        self._text = text
+        self._line = 1
+        self._line_start = 0
+        self._column = 0
+        self._buffer: List[str] = []
+        self._subbuffer: List[str] = []
+        self._scopes: Scopes = Scopes()
+        self._seen = 0 # Bitmask of exited scopes (1 << scope)
+        self._errors: List[str] = []
+
+        dispatch, separators, fallback = self._handlers()
+        scopes = self._scopes
+
+        # Hot loop lookups bound to locals (the value buffer is reused, see `_reset`)
+        match = TOKENS.match
+        collect = self._subbuffer.append
+        invalid = self._invalid
+        size = len(text)
 
         # Parse file
-        while queue:
-            try:
-                char = queue.pop(0)
-
-                # Ignores
-                if char in IGNORE:
+        position = 0
+        while position < size:
+            found = match(text, position)
+            token = found.group(1)
+            position = found.end()
+
+            # Only ignored characters left
+            if not token:
+                break
+
+            # Comments (skipped up to the end of the line)
+            if token == '#' and scopes.top == Scopes.NSPC:
+                newline = text.find('\n', position)
+                position = size if newline < 0 else newline
+                continue
+
+            # Runs of plain characters (valid as a whole)
+            if token[0] not in SPECIAL:
+                top = scopes.top
+                pattern = RUNS.get(top)
+                if pattern is not None and pattern.fullmatch(token):
+                    self._column += len(token)
+                    collect(token)
                     continue
-                
-                ch_index += 1
+
+            # Everything else character by character
+            for char in token:
+                self._column += 1
 
                 # New Line
                 if char == '\n':
-                    line_count += 1
-                    ch_index = 0
-                
-                match (char, scopes.top):
-                    case ('&', Scopes.NSPC):
-                        if Scopes.TSTR in history:
-                            warning('Multiple tape strings defined! Overwriting previous definition!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        scopes.enter(Scopes.TSTR)
-                    case ('@', Scopes.NSPC):
-                        scopes.enter(Scopes.ALPH)
-                    case ('$', Scopes.NSPC):
-                        scopes.enter(Scopes.ATRS)
-                    case ('!', Scopes.NSPC):
-                        scopes.enter(Scopes.INIT)
-                    case ('~', Scopes.NSPC):
-                        scopes.enter(Scopes.HLTS)
-                    case ('*', Scopes.NSPC):
-                        scopes.enter(Scopes.ASTS)
-                    case ('#', Scopes.NSPC):
-                        scopes.enter(Scopes.CMNT)
-                    case ('{', Scopes.FNSP):
-                        if not subbuffer:
-                            subbuffer = ''
-                            buffer = []
-                            error(f'Invalid Scopes.NSPC \'{subbuffer}\'!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid Scopes.NSPC \'{subbuffer}!\'', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        scopes.enter(Scopes.NSPC, subbuffer)
-                        if State(subbuffer) in self.transitions:
-                            subbuffer = ''
-                            buffer = []
-                            warning(f'State \'{state}\' already defined!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            # raise ValueError(f'State \'{state}\' already defined!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        self.transitions.append(State(subbuffer))
-                        subbuffer = ''
-                        buffer = []
-                    case ('}', Scopes.NSPC):
-                        try:
-                            scope, _ = scopes.exit(Scopes.NSPC)
-                        except ValueError as e:
-                            subbuffer = ''
-                            buffer = []
-                            error(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        history.append(scope)
-                    case (':', Scopes.NSPC):
-                        scopes.enter(Scopes.FNSP)
-                    # Exit scopes
-                    case (';', Scopes.TSTR):
-                        try:
-                            scope, _ = scopes.exit(Scopes.TSTR)
-                        except ValueError as e:
-                            subbuffer = ''
-                            buffer = []
-                            error(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        history.append(scope)
-
-                        if not subbuffer:
-                            subbuffer = ''
-                            buffer = []
-                            error(f'Invalid tape string \'{subbuffer}\'!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid tape string \'{subbuffer}\'!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        for char in subbuffer:
-                            if char not in self.alphabet:
-                                subbuffer = ''
-                                buffer = []
-                                error(f'Character not in alphabet \'{char}\'!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                                raise ValueError(f'Character not in alphabet \'{char}\'!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        self.tape = subbuffer
-                        subbuffer = ''
-                        buffer = []
-                    case (';', Scopes.ALPH):
-                        try:
-                            scope, _ = scopes.exit(Scopes.ALPH)
-                        except ValueError as e:
-                            subbuffer = ''
-                            buffer = []
-                            error(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        history.append(scope)
-
-                        buffer.append(subbuffer)
-                        if not subbuffer:
-                            subbuffer = ''
-                            buffer = []
-                            error(f'Invalid Scopes.ALPH {buffer}!')
-                            raise ValueError(f'Invalid Scopes.ALPH {buffer}!')
-                        for char in buffer:
-                            if char in self.alphabet:
-                                warning(f'Character \'{char}\' already defined in Scopes.ALPH!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            if (not char.isalnum()) and (char not in ALLOWED):
-                                subbuffer = ''
-                                buffer = []
-                                error(f'Invalid character \'{char}\' in Scopes.ALPH!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                                raise ValueError(f'Invalid character \'{char}\' in Scopes.ALPH!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        self.alphabet = buffer
-                        if not '_' in self.alphabet:
-                            self.alphabet.append('_')
-                        subbuffer = ''
-                        buffer = []
-                        
-                    case (';', Scopes.ATRS):
-                        try:
-                            scope, _ = scopes.exit(Scopes.ATRS)
-                        except ValueError as e:
-                            subbuffer = ''
-                            buffer = []
-                            error(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        history.append(scope)
-
-                        buffer.append(subbuffer)
-                        if not len(buffer) == 5:
-                            subbuffer = ''
-                            buffer = []
-                            error(f'Invalid transition {buffer}!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid transition {buffer}!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        
-                        buffer[0] = scopes.extend_name(buffer[0] if buffer[0] != '*' else '')
-
-                        if buffer[2][0] == '.':
-                            if State(buffer[2][1:]) in self.transitions:
-                                buffer[2] = State(buffer[2][1:])
-                            else:
-                                subbuffer = ''
-                                buffer = []
-                                error(f'Invalid transition {buffer}!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                                raise ValueError(f'Invalid transition {buffer}!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        else:
-                            buffer[2] = State(scopes.extend_name(buffer[2]))
-                            
-                        self.transitions.append(buffer)
-                        subbuffer = ''
-                        buffer = []
-                        
-                    case (';', Scopes.INIT):
-                        try:
-                            scope, _ = scopes.exit(Scopes.INIT)
-                        except ValueError as e:
-                            subbuffer = ''
-                            buffer = []
-                            error(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        history.append(scope)
-
-                        if not subbuffer:
-                            subbuffer = ''
-                            buffer = []
-                            error(f'Invalid initial state \'{subbuffer}\'!', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid initial state \'{subbuffer}\'!', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        state = State(scopes.extend_name(subbuffer))
-                        self.initial = state
-                        subbuffer = ''
-                        buffer = []
-                        
-                    case (';', Scopes.HLTS):
-                        try:
-                            scope, _ = scopes.exit(Scopes.HLTS)
-                        except ValueError as e:
-                            subbuffer = ''
-                            buffer = []
-                            error(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        history.append(scope)
-
-                        buffer.append(subbuffer)
-                        if not subbuffer:
-                            error(f'Invalid halt states {buffer}!')
-                            raise ValueError(f'Invalid halt states {buffer}!')
-                        for state in buffer:
-                            state = State(scopes.extend_name(state))
-                            if state not in self.transitions:
-                                subbuffer = ''
-                                buffer = []
-                                error(f'Invalid halt state \'{state}\'!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                                raise ValueError(f'Invalid halt state \'{state}\'!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            self.halt.append(state)
-                        
-                        subbuffer = ''
-                        buffer = []
-                    case ('\n', Scopes.CMNT):
-                        subbuffer = ''
-                        buffer = []
-                        try:
-                            scope, _ = scopes.exit(Scopes.CMNT)
-                        except ValueError as e:
-                            subbuffer = ''
-                            buffer = []
-                            error(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        history.append(scope)
-                    case (';', Scopes.ASTS):
-                        buffer.append(subbuffer)
-                        if not subbuffer:
-                            subbuffer = ''
-                            buffer = []
-                            error(f'Invalid states {buffer}!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid states {buffer}!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        for state in buffer:
-                            name_extended = scopes.extend_name(state)
-                            if State(name_extended) in self.transitions:
-                                subbuffer = ''
-                                buffer = []
-                                warning(f'State \'{state}\' already defined!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                                # raise ValueError(f'State \'{state}\' already defined!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            self.transitions.append(State(name_extended))
-                        subbuffer = ''
-                        buffer = []
-                        try:
-                            scope, _ = scopes.exit(Scopes.ASTS)
-                        except ValueError as e:
-                            subbuffer = ''
-                            buffer = []
-                            error(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(e, f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        history.append(scope)
-                    # Separators / Buffer builders
-                    case (':', Scopes.NSPC):
-                        error (f'Invalid character \'{char}\' in namespace!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        raise ValueError(f'Invalid character \'{char}\' in namespace!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                    case (':', Scopes.TSTR):
-                        error (f'Separator \'{char}\' in tape string!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        raise ValueError(f'Separator \'{char}\' in tape string!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                    case (':', Scopes.INIT):
-                        error (f'Separator \'{char}\' in initial state!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        raise ValueError(f'Separator \'{char}\' in initial state!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                    case (':', _):
-                        buffer.append(subbuffer)
-                        subbuffer = ''
-                    case ('>', Scopes.ATRS):
-                        buffer.append(subbuffer)
-                        subbuffer = ''
-                    case ('-', Scopes.ATRS):
-                        continue
-                    # Subbuffer builders
-                    case ('\n', _):
-                        continue
-                    case (_, Scopes.CMNT):
-                        pass
-                    case (_, Scopes.FNSP):
-                        if not char.isalnum():
-                            error(f'Invalid character \'{char}\' in namespace!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid character \'{char}\' in namespace!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        subbuffer += char
-                    case (_, Scopes.TSTR):
-                        if not allowed_tape(char):
-                            error(f'Invalid character \'{char}\' in tape string!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid character \'{char}\' in tape string!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        subbuffer += char
-                    case (_, Scopes.ALPH):
-                        if (not char.isalnum()) and (char not in ALLOWED):
-                            error(f'Invalid character \'{char}\' in alphabet!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid character \'{char}\' in alphabet!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        subbuffer += char
-                    case (_, Scopes.ATRS):
-                        if not allowed_transition(char):
-                            error(f'Invalid character \'{char}\' in transition!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid character \'{char}\' in transition!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        subbuffer += char
-                    case (_, Scopes.INIT):
-                        if not allowed_state(char):
-                            error(f'Invalid character \'{char}\' in initial state!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid character \'{char}\' in initial state!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        subbuffer += char
-                    case (_, Scopes.HLTS):
-                        if not allowed_state(char):
-                            error(f'Invalid character \'{char}\' in halt state!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid character \'{char}\' in halt state!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        subbuffer += char
-                    case (_, Scopes.ASTS):
-                        if not allowed_state(char):
-                            error(f'Invalid character \'{char}\' in add states!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                            raise ValueError(f'Invalid character \'{char}\' in alphabet!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        subbuffer += char
-                    case (_, _):
-                        error(f'Invalid character \'{char}\'!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-                        raise ValueError(f'Invalid character \'{char}\'!', f'Line {line_count}', f'Scope: {scopes.top}', highlight_index(lines[line_count - 1], ch_index))
-            except ValueError:
-                errors += 1
-        try:
-            if not self.initial or self.initial not in self.transitions:
-                error(f'Invalid initial state \'{state}\'!')
-                raise ValueError(f'Invalid initial state \'{state}\'!')
-            
-            # Check if all target states are valid
-            for state in self.transitions.states:
-                for target in state.transitions.values():
-                    if target.new_state not in self.transitions:
-                        error(f'Invalid target state \'{target}\'!')
-                        raise ValueError(f'Invalid target state \'{target}\'!')
-        except ValueError:
-            errors += 1
+                    self._line += 1
+                    self._line_start = position
+                    self._column = 0
+
+                top = scopes.top
+                handler = dispatch.get((char, top)) or separators.get(char) or fallback.get(top, invalid)
+                handler(char)
+
+        # Check if the tape can encode every character of the machine
+        states = self.transitions.states
+        symbols = {*ALPHABET, *self.alphabet, *(self.tape or '')}
+        symbols.update(char for state in states for target in state.transitions.values() for char in (target.char, target.new_char))
+        symbols.discard(ANY)
+
+        if not self.initial or self.initial not in self.transitions:
+            self._fail(f'Invalid initial state \'{self.initial}\'!')
+        if len(symbols) > CODES:
+            self._fail(f'Too many different characters ({len(symbols)}, at most {CODES})!')
+
+        errors = len(self._errors)
         if errors > 0:
             error(f'{errors} error(s) found!')
             return False
         self.tape = Tape(self.tape)
         return True
-        
+
+    def _handlers(self) -> Tuple[Dict[Tuple[str, int], Callable], Dict[str, Callable], Dict[int, Callable]]:
+        """
+        Handlers by (char, scope), by char (any scope) and by scope (any char)
+        """
+
+        dispatch = {
+            ('&', Scopes.NSPC): self._enter_tape,
+            ('@', Scopes.NSPC): partial(self._enter, Scopes.ALPH),
+            ('$', Scopes.NSPC): partial(self._enter, Scopes.ATRS),
+            ('!', Scopes.NSPC): partial(self._enter, Scopes.INIT),
+            ('~', Scopes.NSPC): partial(self._enter, Scopes.HLTS),
+            ('*', Scopes.NSPC): partial(self._enter, Scopes.ASTS),
+            (':', Scopes.NSPC): partial(self._enter, Scopes.FNSP),
+            ('{', Scopes.FNSP): self._open_namespace,
+            ('}', Scopes.NSPC): self._close_namespace,
+            (';', Scopes.TSTR): self._end_tape,
+            (';', Scopes.ALPH): self._end_alphabet,
+            (';', Scopes.ATRS): self._end_transition,
+            (';', Scopes.INIT): self._end_initial,
+            (';', Scopes.HLTS): self._end_halt,
+            (';', Scopes.ASTS): self._end_states,
+            (':', Scopes.TSTR): partial(self._misplaced, 'tape string'),
+            (':', Scopes.INIT): partial(self._misplaced, 'initial state'),
+            ('>', Scopes.ATRS): self._separate,
+            ('-', Scopes.ATRS): self._skip,
+        }
+
+        separators = {
+            ':': self._separate,
+            '\n': self._skip,
+        }
+
+        fallback = {
+            Scopes.FNSP: partial(self._collect, RUNS[Scopes.FNSP], 'namespace'),
+            Scopes.TSTR: partial(self._collect, RUNS[Scopes.TSTR], 'tape string'),
+            Scopes.ALPH: partial(self._collect, RUNS[Scopes.ALPH], 'alphabet'),
+            Scopes.ATRS: partial(self._collect, RUNS[Scopes.ATRS], 'transition'),
+            Scopes.INIT: partial(self._collect, RUNS[Scopes.INIT], 'initial state'),
+            Scopes.HLTS: partial(self._collect, RUNS[Scopes.HLTS], 'halt state'),
+            Scopes.ASTS: partial(self._collect, RUNS[Scopes.ASTS], 'add states'),
+        }
+
+        return dispatch, separators, fallback
+
+    def _context(self) -> Tuple[str, str, str]:
+        """
+        Line, scope and highlighted source of the current character (for messages)
+        """
+
+        end = self._text.find('\n', self._line_start)
+        line = self._text[self._line_start:end if end >= 0 else len(self._text)]
+
+        return f'Line {self._line}', f'Scope: {Scopes.NAMES[self._scopes.top]}', highlight_index(line, self._column)
+
+    def _value(self) -> str:
+        """
+        Current value of the statement
+        """
+
+        return ''.join(self._subbuffer)
+
+    def _reset(self):
+        """
+        Clear the buffers of the current statement
+        """
+
+        self._subbuffer.clear()
+        self._buffer.clear()
+
+    def _fail(self, message: str, *info: str, reset: bool = True) -> bool:
+        """
+        Print and record an error (handlers return the result to abort the statement)
+        """
+
+        if reset:
+            self._reset()
+        error(message, *info)
+        self._errors.append(str(message))
+        return False
+
+    def _add_state(self, name: str) -> bool:
+        """
+        Add state to the transition table (False if it is already defined)
+        """
+
+        if self.transitions.find(name) is not None:
+            return False
+        self.transitions.append(State(name))
+        return True
+
+    def _enter(self, scope: int, char: str):
+        """
+        Enter a scope
+        """
+
+        self._scopes.enter(scope)
+
+    def _exit(self, scope: int) -> bool:
+        """
+        Exit a scope and mark it as seen
+        """
+
+        try:
+            scope = self._scopes.exit(scope)
+        except ValueError as e:
+            return self._fail(e, *self._context())
+        self._seen |= 1 << scope
+        return True
+
+    def _skip(self, char: str):
+        """
+        Ignore character
+        """
+
+    def _separate(self, char: str):
+        """
+        Finish the current value of the statement
+        """
+
+        self._buffer.append(self._value())
+        self._subbuffer.clear()
+
+    def _collect(self, allowed: Pattern, name: str, char: str):
+        """
+        Add character to the current value
+        """
+
+        if not allowed.fullmatch(char):
+            return self._fail(f'Invalid character \'{char}\' in {name}!', *self._context(), reset=False)
+        self._subbuffer.append(char)
+
+    def _misplaced(self, name: str, char: str):
+        """
+        Reject separator
+        """
+
+        return self._fail(f'Separator \'{char}\' in {name}!', *self._context(), reset=False)
+
+    def _invalid(self, char: str):
+        """
+        Reject character
+        """
+
+        return self._fail(f'Invalid character \'{char}\'!', *self._context(), reset=False)
+
+    def _enter_tape(self, char: str):
+        """
+        &<tape-string>
+        """
+
+        if self._seen & 1 << Scopes.TSTR:
+            warning('Multiple tape strings defined! Overwriting previous definition!', *self._context())
+        self._scopes.enter(Scopes.TSTR)
+
+    def _open_namespace(self, char: str):
+        """
+        :<namespace> {
+        """
+
+        name = self._value()
+        if not name:
+            return self._fail(f'Invalid Scopes.NSPC \'{name}\'!', *self._context())
+        self._scopes.enter(Scopes.NSPC, name)
+        if not self._add_state(name):
+            warning(f'State \'{name}\' already defined!', *self._context())
+        self._reset()
+
+    def _close_namespace(self, char: str):
+        """
+        }
+        """
+
+        self._exit(Scopes.NSPC)
+
+    def _end_tape(self, char: str):
+        """
+        &<tape-string>;
+        """
+
+        if not self._exit(Scopes.TSTR):
+            return
+
+        tape = self._value()
+        if not tape:
+            return self._fail(f'Invalid tape string \'{tape}\'!', *self._context())
+        invalid = set(tape) - self._alphabet_set
+        if invalid:
+            char = next(char for char in tape if char in invalid)
+            return self._fail(f'Character not in alphabet \'{char}\'!', *self._context())
+        self.tape = tape
+        self._reset()
+
+    def _end_alphabet(self, char: str):
+        """
+        @<char>:<char>:...;
+        """
+
+        if not self._exit(Scopes.ALPH):
+            return
+
+        buffer = self._buffer
+        value = self._value()
+        buffer.append(value)
+        if not value:
+            return self._fail(f'Invalid Scopes.ALPH {buffer}!')
+        for char in buffer:
+            if char in self._alphabet_set:
+                warning(f'Character \'{char}\' already defined in Scopes.ALPH!', *self._context())
+            if (not char.isalnum()) and (char not in ALLOWED):
+                return self._fail(f'Invalid character \'{char}\' in Scopes.ALPH!', *self._context())
+        self.alphabet = list(buffer)
+        if not '_' in self.alphabet:
+            self.alphabet.append('_')
+        self._alphabet_set = frozenset(self.alphabet)
+        self._reset()
+
+    def _end_transition(self, char: str):
+        """
+        $<state>:<char> -> <new_state>:<new_char>:<direction>;
+        """
+
+        if not self._exit(Scopes.ATRS):
+            return
+
+        buffer = self._buffer
+        buffer.append(self._value())
+        if not len(buffer) == 5:
+            return self._fail(f'Invalid transition {buffer}!', *self._context())
+
+        scopes = self._scopes
+        buffer[0] = scopes.extend_name(buffer[0] if buffer[0] != '*' else '')
+
+        if buffer[2].startswith('.'):
+            state = self.transitions.find(buffer[2][1:])
+            if state is not None:
+                buffer[2] = state
+            else:
+                return self._fail(f'Invalid transition {buffer}!', *self._context())
+        else:
+            buffer[2] = scopes.extend_name(buffer[2])
+
+        if not buffer[0] or not buffer[2]:
+            return self._fail(f'Invalid transition {buffer}! Missing state name.', *self._context())
+
+        try:
+            self.transitions.append(buffer)
+        except ValueError as e:
+            return self._fail(f'{e}!', *self._context())
+        self._reset()
+
+    def _end_initial(self, char: str):
+        """
+        !<state>;
+        """
+
+        if not self._exit(Scopes.INIT):
+            return
+
+        name = self._value()
+        if not name:
+            return self._fail(f'Invalid initial state \'{name}\'!', *self._context()[1:])
+        name = self._scopes.extend_name(name)
+        self.initial = self.transitions.find(name) or State(name)
+        self._reset()
+
+    def _end_halt(self, char: str):
+        """
+        ~<state>:<state>:...;
+        """
+
+        if not self._exit(Scopes.HLTS):
+            return
+
+        buffer = self._buffer
+        value = self._value()
+        buffer.append(value)
+        if not value:
+            return self._fail(f'Invalid halt states {buffer}!')
+        for name in buffer:
+            name_extended = self._scopes.extend_name(name)
+            state = self.transitions.find(name_extended)
+            if state is None:
+                return self._fail(f'Invalid halt state \'{State(name_extended)}\'!', *self._context())
+            self.halt.append(state)
+        self._reset()
+
+    def _end_states(self, char: str):
+        """
+        *<state>:<state>:...;
+        """
+
+        buffer = self._buffer
+        value = self._value()
+        buffer.append(value)
+        if not value:
+            return self._fail(f'Invalid states {buffer}!', *self._context())
+        for name in buffer:
+            if not self._add_state(self._scopes.extend_name(name)):
+                warning(f'State \'{name}\' already defined!', *self._context())
+        self._reset()
+        self._exit(Scopes.ASTS)
+
     def make_turing_machine(self):
         """
         Creates a Turing Machine from the parsed lines.
         """
 
-        for state in self.transitions:
-            if state.name == '':
-                self.transitions.states.remove(state)
+        # Drop the unnamed state
+        self.transitions.remove('')
 
         # Get the tape alphabet
         tape_alphabet = self.alphabet
@@ -2,21 +2,37 @@
 Functions for printing formatted strings to the console.
 """
 
-import subprocess
+import shutil
+import signal
+import sys
+import threading
+from functools import lru_cache
 from typing import List, Union
 # from model import Transition
 import re
 
+# ANSI escape sequences (stripped by `visible`)
+_ANSI = re.compile(r'\x1b[^m]*m')
+
+# ANSI instructions without parameters
+RESET = '\x1B[0m'
+BOLD = '\x1B[1m'
+ITALIC = '\x1B[3m'
+UNDERLINE = '\x1B[4m'
+INVERSE = '\x1B[7m'
+STRIKETHROUGH = '\x1B[9m'
+
 
 def visible(string: str) -> str:
     """
     Returns a string with all non-printable characters and ANSI escape sequences
     removed.
     """
-    return re.sub(r'\x1b[^m]*m', '', string)
+    return _ANSI.sub('', string)
 
 
 
+@lru_cache(maxsize=256)
 def foreground(r, g, b) -> str:
     """
     Returns the ansi instruction for setting the foreground color.
@@ -25,6 +41,7 @@ def foreground(r, g, b) -> str:
     return f'\x1B[38;2;{r};{g};{b}m'
 
 
+@lru_cache(maxsize=256)
 def background(r, g, b) -> str:
     """
     Returns the ansi instruction for setting the background color.
@@ -38,7 +55,7 @@ def reset() -> str:
     Returns the ansi instruction for resetting the colors.
     """
 
-    return '\x1B[0m'
+    return RESET
 
 
 def bold() -> str:
@@ -46,7 +63,7 @@ def bold() -> str:
     Returns the ansi instruction for setting the bold font.
     """
 
-    return '\x1B[1m'
+    return BOLD
 
 
 def underline() -> str:
@@ -54,7 +71,7 @@ def underline() -> str:
     Returns the ansi instruction for setting the underline font.
     """
 
-    return '\x1B[4m'
+    return UNDERLINE
 
 
 def italic() -> str:
@@ -62,7 +79,7 @@ def italic() -> str:
     Returns the ansi instruction for setting the italic font.
     """
 
-    return '\x1B[3m'
+    return ITALIC
 
 
 def strikethrough() -> str:
@@ -70,7 +87,7 @@ def strikethrough() -> str:
     Returns the ansi instruction for setting the strikethrough font.
     """
 
-    return '\x1B[9m'
+    return STRIKETHROUGH
 
 
 def inverse() -> str:
@@ -78,21 +95,31 @@ def inverse() -> str:
     Returns the ansi instruction for setting the inverse font.
     """
 
-    return '\x1B[7m'
+    return INVERSE
 
 
-def debug(header: str, *info: str) -> None:
+# Message tags (see `_message`)
+_DEBUG = f'{foreground(200, 200, 200)}[DEBUG]\t'
+_INFO = f'{BOLD}{foreground(0, 0, 255)}[INFO]\t{RESET}'
+_WARNING = f'{BOLD}{foreground(255, 255, 0)}[WARNING]\t{RESET}'
+_ERROR = f'{BOLD}{foreground(255, 0, 0)}[ERROR]\t{RESET}'
+
+
+def _message(tag: str, header: str, info: tuple, end: str = '') -> None:
     """
-    Prints a debug message to the console. (light gray text, bold)
+    Prints a tagged message with its info lines (prefixed by '\t┊ ') to the console.
     """
 
-    print(f'{foreground(200, 200, 200)}[DEBUG]\t{header}')
+    body = '\t┊ ' + '\n'.join(map(str, info)).replace('\n', '\n\t┊ ') + '\n' if info else ''
+    sys.stdout.write(f'{tag}{header}\n{body}{end}')
 
-    for i in info:
-        for l in str(i).split('\n'):
-            print(f'\t┊ {l}')
 
-    print(reset())
+def debug(header: str, *info: str) -> None:
+    """
+    Prints a debug message to the console. (light gray text, bold)
+    """
+
+    _message(_DEBUG, header, info, f'{RESET}\n')
 
 
 def info(header: str, *info: str) -> None:
@@ -100,11 +127,7 @@ def info(header: str, *info: str) -> None:
     Prints an info message to the console. (light blue text, bold)
     """
 
-    print(f'{bold()}{foreground(0, 0, 255)}[INFO]\t{reset()}{header}')
-
-    for i in info:
-        for l in str(i).split('\n'):
-            print(f'\t┊ {l}')
+    _message(_INFO, header, info)
 
 
 def warning(header: str, *info: str) -> None:
@@ -112,11 +135,7 @@ def warning(header: str, *info: str) -> None:
     Prints a warning message to the console. (yellow text, bold)
     """
 
-    print(f'{bold()}{foreground(255, 255, 0)}[WARNING]\t{reset()}{header}')
-
-    for i in info:
-        for l in str(i).split('\n'):
-            print(f'\t┊ {l}')
+    _message(_WARNING, header, info)
 
 
 def error(header: str, *info: str) -> None:
@@ -124,24 +143,20 @@ def error(header: str, *info: str) -> None:
     Prints an error message to the console. (red text, bold)
     """
 
-    print(f'{bold()}{foreground(255, 0, 0)}[ERROR]\t{reset()}{header}')
-
-    for i in info:
-        for l in str(i).split('\n'):
-            print(f'\t┊ {l}')
+    _message(_ERROR, header, info)
 
 
-def print_step(machine, transtition, step: int) -> None:
+def print_step(machine, transition, step: int) -> None:
     """
     Prints the current step to the console.
     """
 
     redraw(
-        f'{bold()}{foreground(0, 255, 0)}Step {step}{reset()}\n' +
-        f'{bold()}{foreground(0, 255, 0)}Tape{reset()}\n' +
-        f'{machine.tape.fancy()}\n' +
-        f'{bold()}{foreground(0, 255, 0)}Transition{reset()}\n' +
-        f'\t{transition_string(transtition)}'
+        f'{_HIGHLIGHT}Step {step}{RESET}\n'
+        f'{_HIGHLIGHT}Tape{RESET}\n'
+        f'{machine.tape.fancy()}\n'
+        f'{_HIGHLIGHT}Transition{RESET}\n'
+        f'\t{transition_string(transition)}'
     )
 
 
@@ -150,31 +165,31 @@ def yes_no(question: str, default: bool = False) -> bool:
     Asks the user a yes/no question.
     """
 
-    while True:
-        answer = input(f'{question} [{("Y" if default else "y")}/{("N" if not default else "n")}]: ')
-
-        if answer == '':
-            return default
+    prompt = f'{question} [{("Y" if default else "y")}/{("N" if not default else "n")}]: '
+    answers = {'': default, 'y': True, 'n': False}
 
-        if answer.lower() == 'y':
-            return True
+    while True:
+        answer = answers.get(input(prompt).lower())
 
-        if answer.lower() == 'n':
-            return False
+        if answer is not None:
+            return answer
 
         print('Please answer with either "y" or "n".')
 
+# Highlighted text (bold, green)
+_HIGHLIGHT = f'{BOLD}{foreground(0, 255, 0)}'
+
 def highlight_index(string: Union[str, List], index: int):
     """
-    Highlights the given index in the given string.
+    Highlights the given index in the given string (or list of characters).
     """
 
-    if isinstance(string, list):
-        string = ''.join(string)
-
     if index < 0 or index >= len(string):
-        return string
-    return string[:index] + f'{bold()}{foreground(0,255,0)}{string[index]}{reset()}' + string[index + 1:]
+        return string if isinstance(string, str) else ''.join(string)
+
+    if isinstance(string, list):
+        return ''.join([*string[:index], _HIGHLIGHT, string[index], RESET, *string[index + 1:]])
+    return ''.join((string[:index], _HIGHLIGHT, string[index], RESET, string[index + 1:]))
 
 def print_highlight(string: str, index: int) -> None:
     """
@@ -188,19 +203,44 @@ def redraw(string: str) -> None:
     Redraws the console with the given tape and index highlighted.
     """
 
-    print(f'\x1b[2J\x1b[H')
-    print(string)
+    sys.stdout.write(f'\x1b[2J\x1b[H{string}\n')
+
+# Cached terminal width (None until queried or after a resize)
+_width = None
+
+# Whether the SIGWINCH handler is installed (the width is only cached then)
+_watching = False
+
+def _resized(signum, frame) -> None:
+    """
+    Invalidates the cached terminal width.
+    """
+
+    global _width
+    _width = None
 
 def get_terminal_width() -> int:
     """
     Returns the width of the terminal.
     """
 
-    return int(subprocess.check_output(['tput', 'cols']))
+    global _width, _watching
+    if _width is not None:
+        return _width
+
+    # Signal handlers can only be installed from the main thread
+    if not _watching and hasattr(signal, 'SIGWINCH') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGWINCH, _resized)
+        _watching = True
+
+    width = shutil.get_terminal_size().columns
+    if _watching:
+        _width = width
+    return width
 
 def transition_string(transition) -> str:
     """
     Returns a string representation of the given transition.
     """
 
-    return f'{transition.state.name} : {transition.char} -> {transition.new_state.name} : {transition.char} : {transition.direction}'
\ No newline at end of file
+    return f'{transition.state.name} : {transition.char} -> {transition.new_state.name} : {transition.new_char} : {transition.direction}'
\ No newline at end of file
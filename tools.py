@@ -2,23 +2,48 @@
 Includes general functions for the project.
 """
 
+import re
 from printf import *
 
 ALLOWED = [
     '#', '_'
 ]
 
+def _chars(extra: str = '') -> str:
+    """
+    Pattern for a single alphanumeric character (as in str.isalnum()) or one of `extra`
+    """
+
+    if '_' in extra:
+        # \w covers the alphanumeric characters and '_'
+        return f'[\\w{re.escape(extra.replace("_", ""))}]'
+    if extra:
+        return f'(?:[^\\W_]|[{re.escape(extra)}])'
+    return r'[^\W_]'
+
+# Characters of names, states, tapes and transitions (shared with the parser)
+NAME_CHARS = _chars()
+STATE_CHARS = _chars('.')
+TAPE_CHARS = _chars(''.join(ALLOWED))
+TRANSITION_CHARS = _chars(''.join(ALLOWED) + '.*')
+
+# Valid strings
+_STATE = re.compile(f'{STATE_CHARS}*')
+_TRANSITION = re.compile(f'{TRANSITION_CHARS}*')
+_TAPE = re.compile(f'{TAPE_CHARS}*')
+
+# Invalid characters (removed by the strip_* functions)
+_INVALID_STATE = re.compile(f'(?!{STATE_CHARS}).', re.S)
+_INVALID_TAPE = re.compile(f'(?!{TAPE_CHARS}).', re.S)
+
 def strip_state(string, silent=False):
     """
     Strips the string of all non alphanumeric characters.
     """
     
-    stripped = ''
-    for char in string:
-        if allowed_state(char):
-            stripped += char
+    stripped, dropped = _INVALID_STATE.subn('', string)
     
-    if stripped != string:
+    if dropped:
         warning(f'Invalid state \'{string}\'! Corrected to \'{stripped}\'')
 
     return stripped
@@ -28,42 +53,30 @@ def allowed_state(string: str):
     Checks if the string is a valid state.
     """
 
-    for char in string:
-        if not char.isalnum() and char != '.':
-            return False
-    return True
+    return _STATE.fullmatch(string) is not None
 
 def allowed_transition(string: str):
     """
     Checks if the string contains invalid characters.
     """
 
-    for char in string:
-        if (not char.isalnum()) and char not in ALLOWED + ['.', '*']:
-            return False
-    return True
+    return _TRANSITION.fullmatch(string) is not None
 
 def allowed_tape(string: str):
     """
     Checks if the string contains invalid characters.
     """
 
-    for char in string:
-        if not char.isalnum() and char not in ALLOWED:
-            return False
-    return True
+    return _TAPE.fullmatch(string) is not None
 
 def strip_tape(string):
     """
     Strips the string of all forbidden characters.
     """
     
-    stripped = ''
-    for char in string:
-        if allowed_tape(char):
-            stripped += char
+    stripped, dropped = _INVALID_TAPE.subn('', string)
 
-    if stripped != string:
+    if dropped:
         warning(f'Invalid tape \'{string}\'! Corrected to \'{stripped}\'')
     
     return stripped
\ No newline at end of file
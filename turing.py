@@ -3,7 +3,6 @@ Tests
 """
 
 from parser import Parser
-from printf import redraw
 
 
 def main():